@@ -1,4 +1,6 @@
 import os
+import logging
+from logging.handlers import RotatingFileHandler, WatchedFileHandler
 from flask import Flask
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
@@ -12,9 +14,37 @@ login_manager = LoginManager()
 cache = Cache()
 migrate = Migrate()
 
+def configure_logging(app):
+    log_file = app.config['LOG_FILE']
+    root = logging.getLogger()
+    if any(getattr(h, 'baseFilename', None) == os.path.abspath(log_file) for h in root.handlers):
+        return
+    if not os.path.exists(os.path.dirname(log_file)):
+        os.makedirs(os.path.dirname(log_file))
+    if app.config['LOG_ROTATE']:
+        file_handler = RotatingFileHandler(log_file, maxBytes=10240000, backupCount=10, delay=True)
+    else:
+        # Several worker processes append to one file; rotation is left to logrotate.
+        file_handler = WatchedFileHandler(log_file, delay=True)
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+    ))
+    file_handler.setLevel(logging.INFO)
+    root.addHandler(file_handler)
+    root.setLevel(logging.INFO)  # Ensure the root logger captures INFO messages
+
+def shutdown_app(app):
+    """Release per-process resources on worker exit: end event streams, flush logs, close DB connections."""
+    app.extensions['event_broker'].close()
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    with app.app_context():
+        db.engine.dispose()
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    configure_logging(app)
     
     # Ensure the upload folder exists
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -25,14 +55,21 @@ def create_app():
     login_manager.login_view = 'main.login'
     cache.init_app(app)
     Talisman(app, content_security_policy=None)
-    migrate.init_app(app, db)
+    from app.search import include_name
+    migrate.init_app(app, db, include_name=include_name)
     
+    from app.events import init_broker
+    init_broker(app)
+
     from app.routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
     
     with app.app_context():
         db.create_all()
 
+        from app.search import init_search
+        init_search()
+
         from app.models import User
         admin_exists = db.session.query(User.query.filter_by(username="superadmin").exists()).scalar()
 
@@ -0,0 +1,146 @@
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from app import db
+from app.models import BrokerEvent
+
+def hall_channel(hall_id):
+    return f"hall:{hall_id}"
+
+def booking_payload(booking):
+    return {
+        "id": booking.id,
+        "booking_code": booking.booking_code,
+        "booking_date": str(booking.booking_date),
+        "time_slot": booking.time_slot,
+        "user_name": booking.user_name,
+        "status": booking.status,
+        "created_at": str(booking.created_at),
+    }
+
+class LocalBroker:
+    """In-process pub/sub: every subscriber gets its own bounded queue.
+
+    subscribe returns None once max_subscribers queues are open, because each open
+    event stream holds a server thread for as long as the dashboard stays open.
+    """
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        q = queue.Queue(maxsize=100)
+        with self._lock:
+            if self.max_subscribers is not None and \
+                    sum(len(qs) for qs in self._subscribers.values()) >= self.max_subscribers:
+                return None
+            self._subscribers.setdefault(channel, set()).add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                pass  # A stalled client misses events and catches up on its next page load
+
+    def close(self):
+        # None tells open event streams to finish so a stopping worker is not held up by them.
+        with self._lock:
+            subscribers = [q for qs in self._subscribers.values() for q in qs]
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(None)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+class DatabaseBroker(LocalBroker):
+    """Relays events through the BrokerEvent table so subscribers in every worker process receive them.
+
+    Each process polls the table from one background thread and fans new rows out locally.
+    Publishers purge rows older than retention, so the table stays bounded whether or not
+    anyone is subscribed.
+    """
+
+    def __init__(self, app, poll_interval=1.0, retention=timedelta(hours=1), purge_interval=timedelta(minutes=5),
+                 max_subscribers=None):
+        super().__init__(max_subscribers)
+        self.app = app
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._last_purge = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def publish(self, channel, event):
+        table = BrokerEvent.__table__
+        now = datetime.now(timezone.utc)
+        with db.engine.begin() as connection:
+            connection.execute(table.insert().values(channel=channel, payload=json.dumps(event), created_at=now))
+            if self._last_purge is None or time.monotonic() - self._last_purge > self.purge_interval.total_seconds():
+                connection.execute(table.delete().where(table.c.created_at < now - self.retention))
+                self._last_purge = time.monotonic()
+
+    def subscribe(self, channel):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll, name="event-broker", daemon=True)
+                self._thread.start()
+        return super().subscribe(channel)
+
+    def close(self):
+        self._stopped.set()
+        super().close()
+
+    def _poll(self):
+        table = BrokerEvent.__table__
+        with self.app.app_context():
+            with db.engine.connect() as connection:
+                last_id = connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0
+            while not self._stopped.wait(self.poll_interval):
+                try:
+                    with db.engine.connect() as connection:
+                        rows = connection.execute(
+                            db.select(table.c.id, table.c.channel, table.c.payload)
+                            .where(table.c.id > last_id).order_by(table.c.id)
+                        ).all()
+                except Exception:
+                    logging.exception("Event broker poll failed")
+                    continue
+                for row in rows:
+                    self.deliver(row.channel, json.loads(row.payload))
+                    last_id = row.id
+
+def init_broker(app):
+    max_subscribers = app.config.get('EVENT_STREAMS_PER_WORKER')
+    if app.config.get('EVENT_BROKER') == 'database':
+        broker = DatabaseBroker(app, poll_interval=app.config.get('EVENT_POLL_INTERVAL', 1.0),
+                                max_subscribers=max_subscribers)
+    else:
+        broker = LocalBroker(max_subscribers)
+    app.extensions['event_broker'] = broker
+    return broker
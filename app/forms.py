@@ -1,7 +1,9 @@
 import re
+import calendar
+from datetime import timedelta
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, DateField, SelectField, DecimalField, TextAreaField
-from wtforms.validators import DataRequired, Length, EqualTo, ValidationError
+from wtforms.validators import DataRequired, Length, EqualTo, Optional, ValidationError
 from flask_wtf.file import MultipleFileField, FileAllowed
 
 def validate_password_strength(password):
@@ -16,6 +18,27 @@ def validate_password_strength(password):
     # if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
     #     raise ValidationError("Password must contain a special character.")
 
+def recurring_dates(start, end, recurrence):
+    if end is None:
+        return [start]
+    dates = []
+    i = 0
+    while True:
+        if recurrence == "weekly":
+            day = start + timedelta(weeks=i)
+        elif recurrence == "monthly":
+            year, month = divmod(start.month - 1 + i, 12)
+            year, month = start.year + year, month + 1
+            day = start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+        else:
+            day = start + timedelta(days=i)
+        if day > end:
+            return dates
+        dates.append(day)
+        i += 1
+
+MAX_GROUP_BOOKINGS = 60
+
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=50)])
     password = PasswordField('Password', validators=[DataRequired()])
@@ -65,11 +88,25 @@ class EditHallForm(FlaskForm):
 class BookingForm(FlaskForm):
     booking_date = DateField('Booking Date (YYYY-MM-DD)', format='%Y-%m-%d', validators=[DataRequired()])
     time_slot = SelectField('Time Slot', choices=[('morning','Morning'), ('evening','Evening')], validators=[DataRequired()])
+    end_date = DateField('Repeat Until (optional)', format='%Y-%m-%d', validators=[Optional()])
+    recurrence = SelectField('Repeat', choices=[('daily','Every day'), ('weekly','Every week'), ('monthly','Every month')], default='daily')
     user_name = StringField('Your Name', validators=[DataRequired(), Length(min=2, max=100)])
     phone_number = StringField('Phone Number (confirmation)')
     id_number = StringField('ID Number (confirmation)')
     submit = SubmitField('Submit Booking')
 
+    def validate_end_date(self, end_date):
+        if end_date.data and self.booking_date.data:
+            if end_date.data < self.booking_date.data:
+                raise ValidationError("End date must be on or after the booking date.")
+            if end_date.data > self.booking_date.data + timedelta(days=365):
+                raise ValidationError("Recurring bookings can span at most one year.")
+            if len(recurring_dates(self.booking_date.data, end_date.data, self.recurrence.data)) > MAX_GROUP_BOOKINGS:
+                raise ValidationError(f"You can request at most {MAX_GROUP_BOOKINGS} dates at once.")
+
+class BulkBookingForm(FlaskForm):
+    action = SelectField('Action', choices=[('approve','Approve'), ('cancel','Cancel')], validators=[DataRequired()])
+
 class ChangePasswordForm(FlaskForm):
     old_password = PasswordField('Old Password', validators=[DataRequired()])
     new_password = PasswordField('New Password', validators=[DataRequired(), Length(min=8)])
@@ -55,6 +55,7 @@ class Booking(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     phone_number = db.Column(db.String(20), nullable=True)
     id_number = db.Column(db.String(50), nullable=True)
+    group_code = db.Column(db.String(10), nullable=True, index=True)  # Shared by bookings requested together
 
 class Logging(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -64,3 +65,26 @@ class Logging(db.Model):
     action = db.Column(db.String(100), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     details = db.Column(db.Text)
+
+class ContentVersion(db.Model):
+    key = db.Column(db.String(50), primary_key=True)  # "halls" or "hall:<id>"
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+class HallSearchTerm(db.Model):
+    # Inverted index used for hall search when SQLite FTS5 is not available
+    hall_id = db.Column(db.Integer, db.ForeignKey('hall.id'), primary_key=True)
+    term = db.Column(db.String(50), primary_key=True, index=True)
+    weight = db.Column(db.Integer, nullable=False, default=1)
+
+class BrokerEvent(db.Model):
+    # Outbox read by every worker when EVENT_BROKER = "database"
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ScheduledTaskRun(db.Model):
+    # Last day a once-per-day task ran, shared by every worker process
+    name = db.Column(db.String(50), primary_key=True)
+    last_run = db.Column(db.Date, nullable=False)
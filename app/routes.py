@@ -1,35 +1,28 @@
+import io
 import os
 import uuid
+import click
+import queue
 import json
+import time
+import hashlib
 import calendar
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, make_response, abort, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import event
 from PIL import Image
 from app import db, cache, login_manager
-from app.models import Hall, User, Booking, Logging
-from app.forms import LoginForm, CreateHallForm, EditHallForm, BookingForm, ChangePasswordForm
+from app.models import Hall, User, Booking, Logging, ContentVersion, ScheduledTaskRun
+from app.search import search_halls
+from app.events import hall_channel, booking_payload
+from app.forms import LoginForm, CreateHallForm, EditHallForm, BookingForm, BulkBookingForm, ChangePasswordForm, recurring_dates
 import logging
-from logging.handlers import RotatingFileHandler
 from werkzeug.security import check_password_hash
 
-# -------------------------
-# Configure Logging to File
-# -------------------------
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240000, backupCount=10, delay=True)
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-))
-file_handler.setLevel(logging.INFO)
-logging.getLogger().addHandler(file_handler)
-logging.getLogger().setLevel(logging.INFO)  # Ensure the root logger captures INFO messages
-
 # -------------------------
 # Define SQLAlchemy Event Listeners
 # -------------------------
@@ -49,7 +42,7 @@ for model in (Hall, User, Booking):
 
 # -------------------------
 # Blueprint and Helper Functions
-main = Blueprint('main', __name__)
+main = Blueprint('main', __name__, cli_group=None)
 
 # --- Custom Decorators ---
 def site_admin_required(f):
@@ -77,6 +70,122 @@ def log_action(hall_id, user_id, username, action, details=""):
     db.session.add(log_entry)
     current_app.logger.info(f"Log action: Hall {hall_id}, User {username}, Action: {action}, Details: {details}")
 
+def publish_booking_event(hall_id, event_type, payloads):
+    # Call after commit so dashboards never see a change that was rolled back.
+    current_app.extensions['event_broker'].publish(hall_channel(hall_id), {"type": event_type, "bookings": payloads})
+
+def hall_version_key(hall_id):
+    return f"hall:{hall_id}"
+
+HALLS_VERSION_KEY = "halls"
+
+def bump_content_version(*keys):
+    # Runs inside the caller's transaction so the new version commits with the change itself.
+    now = datetime.now(timezone.utc)
+    for key in set(keys):
+        bumped = ContentVersion.query.filter(ContentVersion.key == key).update(
+            {ContentVersion.version: ContentVersion.version + 1, ContentVersion.updated_at: now},
+            synchronize_session=False)
+        if bumped:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(ContentVersion(key=key, version=1, updated_at=now))
+        except IntegrityError:
+            # Another request created the row first; bump the one it committed.
+            ContentVersion.query.filter(ContentVersion.key == key).update(
+                {ContentVersion.version: ContentVersion.version + 1, ContentVersion.updated_at: now},
+                synchronize_session=False)
+
+def page_validators(keys):
+    rows = ContentVersion.query.filter(ContentVersion.key.in_(keys)).all()
+    versions = {row.key: row.version for row in rows}
+    parts = [f"{key}={versions.get(key, 0)}" for key in sorted(keys)]
+
+    # The rendered page also depends on who is asking, the CSRF token embedded in
+    # forms, and the month the calendars start from.
+    parts.append(f"user={current_user.id if current_user.is_authenticated else 'anon'}")
+    parts.append(f"csrf={session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'), '')}")
+    month_start = datetime.today().date().replace(day=1)
+    parts.append(f"month={month_start}")
+    parts.append(f"salt={current_app.config.get('ETAG_SALT', '')}")
+    # Last-Modified must also move when the month or the CSRF window changes, or
+    # If-Modified-Since clients would keep revalidating a stale calendar or form.
+    time_inputs = [datetime(month_start.year, month_start.month, 1, tzinfo=timezone.utc)]
+    csrf_time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if csrf_time_limit:
+        # Signed CSRF tokens expire, so a cached form may only be revalidated for half their lifetime.
+        window = int(time.time() // (csrf_time_limit / 2))
+        parts.append(f"window={window}")
+        time_inputs.append(datetime.fromtimestamp(int(window * csrf_time_limit / 2), timezone.utc))
+
+    etag = hashlib.sha256("|".join(parts).encode()).hexdigest()
+    updated = [row.updated_at if row.updated_at.tzinfo else row.updated_at.replace(tzinfo=timezone.utc) for row in rows]
+    last_modified = max(updated + time_inputs).replace(microsecond=0)
+    return etag, last_modified
+
+def conditional_get(version_keys):
+    """Answer GET/HEAD with 304 when the client's copy is current, before the view does any work.
+
+    version_keys receives the view arguments and returns the ContentVersion keys the page depends on.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return f(*args, **kwargs)
+            etag, last_modified = page_validators(version_keys(**kwargs))
+            # Last-Modified does not capture the logged in user, so it is only used for anonymous visitors.
+            anonymous = not current_user.is_authenticated
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif anonymous and request.if_modified_since and last_modified:
+                not_modified = last_modified <= request.if_modified_since
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if anonymous and last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
+
+def hall_detail_version_keys(slug):
+    hall_id = db.session.query(Hall.id).filter_by(slug=slug).scalar()
+    if hall_id is None:
+        abort(404)
+    return [hall_version_key(hall_id)]
+
+def save_picture(file):
+    """Store an uploaded picture under the hash of its content and return the filename.
+
+    Identical uploads map to the same file, so each distinct image is processed and written once.
+    """
+    data = file.read()
+    ext = file.filename.split('.')[-1].lower()
+    filename = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    filepath = os.path.join(upload_folder, filename)
+    if os.path.exists(filepath):
+        os.utime(filepath)  # Keep a reused file inside the gc-uploads grace period
+        return filename
+    image = Image.open(io.BytesIO(data))
+    image.thumbnail((10000, 400), Image.Resampling.LANCZOS)
+    # Write under a temporary name so a half written file never appears under its final name.
+    tmp_path = os.path.join(upload_folder, f".{uuid.uuid4().hex}.{ext}")
+    image.save(tmp_path)
+    os.replace(tmp_path, filepath)
+    return filename
+
 def generate_month_calendar( year, month, timeslot, booking_map):
     first_day = datetime(year, month, 1).date()
     last_day = datetime(year, month, calendar.monthrange(year, month)[1]).date()
@@ -107,20 +216,50 @@ def generate_month_calendar( year, month, timeslot, booking_map):
         "weeks": weeks
     }
 
-# Global variable for daily cleanup
+# Per-process shortcut for the daily cleanup; claim_daily_cleanup makes it run once across workers
 LAST_CLEANUP_DATE = None
+CLEANUP_TASK_NAME = "pending-expiry"
 DEFULT_PASSWORD = 'onlyyou'
 
+def claim_daily_cleanup(today_date):
+    # The conditional UPDATE only succeeds for one worker; the claim commits with the cleanup itself.
+    claimed = ScheduledTaskRun.query.filter(
+        ScheduledTaskRun.name == CLEANUP_TASK_NAME,
+        ScheduledTaskRun.last_run < today_date
+    ).update({ScheduledTaskRun.last_run: today_date}, synchronize_session=False)
+    if claimed:
+        return True
+    if db.session.get(ScheduledTaskRun, CLEANUP_TASK_NAME) is not None:
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.add(ScheduledTaskRun(name=CLEANUP_TASK_NAME, last_run=today_date))
+    except IntegrityError:
+        return False
+    return True
+
 @main.before_app_request
 def expire_pending_bookings():
     global LAST_CLEANUP_DATE
     today_date = datetime.now(timezone.utc).date()
     if LAST_CLEANUP_DATE != today_date:
-        expired_count = Booking.query.filter(
+        if not claim_daily_cleanup(today_date):
+            db.session.rollback()
+            LAST_CLEANUP_DATE = today_date
+            return
+        expired = Booking.query.filter(
             Booking.status == 'pending', 
             Booking.created_at < datetime.now(timezone.utc) - timedelta(days=1)
-        ).update({"status": "cancelled"}, synchronize_session=False)
+        )
+        expired_by_hall = {}
+        for booking in expired:
+            expired_by_hall.setdefault(booking.hall_id, []).append(dict(booking_payload(booking), status="cancelled"))
+        expired_count = expired.update({"status": "cancelled"}, synchronize_session=False)
+        if expired_by_hall:
+            bump_content_version(*[hall_version_key(hall_id) for hall_id in expired_by_hall])
         db.session.commit()
+        for hall_id, payloads in expired_by_hall.items():
+            publish_booking_event(hall_id, "expired", payloads)
         LAST_CLEANUP_DATE = today_date
 
 @login_manager.user_loader
@@ -133,10 +272,24 @@ def get_all_halls():
     return Hall.query.all()
 
 @main.route('/')
+@conditional_get(lambda: [HALLS_VERSION_KEY])
 def index():
     halls = get_all_halls()
     return render_template('index.html', halls=halls)
 
+@main.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 20
+    halls, total = search_halls(query, page=page, per_page=per_page)
+    if request.args.get('format') == 'json':
+        return jsonify(total=total, halls=[
+            {"name": hall.name, "url": url_for('main.hall_detail', slug=hall.slug)} for hall in halls
+        ])
+    return render_template('search.html', query=query, halls=halls, total=total,
+                           page=page, pages=(total + per_page - 1) // per_page)
+
 @main.route('/login', methods=['GET','POST'])
 def login():
     form = LoginForm()
@@ -216,13 +369,9 @@ def create_hall_admin():
             if form.pictures.data:
                 for file in form.pictures.data[:6]:
                     if file:
-                        ext = file.filename.split('.')[-1]
-                        unique_filename = f"{slug}_{uuid.uuid4().hex}.{ext}"
-                        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-                        image = Image.open(file)
-                        image.thumbnail((10000, 400), Image.Resampling.LANCZOS)
-                        image.save(filepath)
-                        picture_filenames.append(unique_filename)
+                        filename = save_picture(file)
+                        if filename not in picture_filenames:
+                            picture_filenames.append(filename)
             hall.pictures = json.dumps(picture_filenames)
         except IntegrityError:
             db.session.rollback()
@@ -230,6 +379,8 @@ def create_hall_admin():
             flash("A hall with this slug already exists. Please choose a different slug.")
             return redirect(url_for('main.create_hall_admin'))
         db.session.add(hall)
+        db.session.flush()
+        bump_content_version(HALLS_VERSION_KEY, hall_version_key(hall.id))
         db.session.commit()
         cache.delete_memoized(get_all_halls)
         random_uuid_letters_lower = str(uuid.uuid4()).replace('-', '')[:2].lower()
@@ -321,16 +472,14 @@ def edit_hall():
                 for file in form.pictures.data[:6]:
                     if hasattr(file, 'filename') and file.filename:
                         if file:
-                            ext = file.filename.split('.')[-1]
-                            unique_filename = f"{hall.slug}_{uuid.uuid4().hex}.{ext}"
-                            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-                            image = Image.open(file)
-                            image.thumbnail((10000, 400), Image.Resampling.LANCZOS)
-                            image.save(filepath)
-                            picture_filenames.append(unique_filename)
+                            filename = save_picture(file)
+                            if filename not in picture_filenames:
+                                picture_filenames.append(filename)
                 picture_filenames = picture_filenames[:6]
                 hall.pictures = json.dumps(picture_filenames)
+        bump_content_version(HALLS_VERSION_KEY, hall_version_key(hall.id))
         db.session.commit()
+        cache.delete_memoized(get_all_halls)
         log_action(hall.id, current_user.id, current_user.username, "Edit Hall", f"Hall '{hall.name}' was updated by the owner.")
         db.session.commit()
         flash("Hall details updated.")
@@ -384,16 +533,14 @@ def website_admin_edit_hall(hall_id):
                 for file in form.pictures.data[:6]:
                     if hasattr(file, 'filename') and file.filename:
                         if file:
-                            ext = file.filename.split('.')[-1]
-                            unique_filename = f"{hall.slug}_{uuid.uuid4().hex}.{ext}"
-                            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-                            image = Image.open(file)
-                            image.thumbnail((10000, 400), Image.Resampling.LANCZOS)
-                            image.save(filepath)
-                            picture_filenames.append(unique_filename)
+                            filename = save_picture(file)
+                            if filename not in picture_filenames:
+                                picture_filenames.append(filename)
                 picture_filenames = picture_filenames[:6]
                 hall.pictures = json.dumps(picture_filenames)
+        bump_content_version(HALLS_VERSION_KEY, hall_version_key(hall.id))
         db.session.commit()
+        cache.delete_memoized(get_all_halls)
         log_action(hall.id, current_user.id, current_user.username, "Edit Hall", f"Hall '{hall.name}' was updated by the webstie admin.")
         db.session.commit()
         flash("Hall details updated.")
@@ -426,6 +573,7 @@ def website_admin():
 
 
 @main.route('/<slug>', methods=['GET', 'POST'])
+@conditional_get(hall_detail_version_keys)
 def hall_detail(slug):
     hall = Hall.query.options(joinedload(Hall.bookings)).filter_by(slug=slug).first_or_404()
     form = BookingForm()
@@ -454,31 +602,53 @@ def hall_detail(slug):
         calendars["evening"].append(generate_month_calendar(year, month, "evening", booking_map))
 
     if form.validate_on_submit():
-        booking_date = form.booking_date.data
         time_slot = form.time_slot.data
         user_name = form.user_name.data
-        existing = db.session.query(Booking.id).filter(
+        dates = recurring_dates(form.booking_date.data, form.end_date.data, form.recurrence.data)
+
+        # One query for every candidate date instead of one existence check per date.
+        taken = {d for (d,) in db.session.query(Booking.booking_date).filter(
             Booking.hall_id == hall.id,
-            Booking.booking_date == booking_date,
+            Booking.booking_date.in_(dates),
             Booking.time_slot == time_slot,
             Booking.status.in_(["approved", "pending"])
-        ).first()
-        if existing:
-            flash("This slot is already booked.")
-            return redirect(url_for('main.hall_detail', slug=slug))
-
-        booking = Booking(
-            hall_id=hall.id,
-            booking_date=booking_date,
-            time_slot=time_slot,
-            user_name=user_name,
-            status='pending',
-            created_at=datetime.now(timezone.utc)
-        )
-        db.session.add(booking)
-        log_action(hall.id, current_user.id, current_user.username, "Booking Created", f"Booking {booking.booking_code} created for {booking_date}.")
-        db.session.commit()
-        return redirect(url_for('main.booking_confirmation', booking_code=booking.booking_code))
+        )}
+        available = [d for d in dates if d not in taken]
+        if not available:
+            # hall_detail.html shows form errors, so re-render instead of redirecting with a flash.
+            form.booking_date.errors.append("This slot is already booked." if len(dates) == 1 else "All of the requested dates are already booked.")
+        else:
+            group_code = str(uuid.uuid4()).replace('-', '')[:10] if len(dates) > 1 else None
+            now = datetime.now(timezone.utc)
+            bookings = [Booking(
+                hall_id=hall.id,
+                booking_date=booking_date,
+                time_slot=time_slot,
+                user_name=user_name,
+                status='pending',
+                group_code=group_code,
+                created_at=now
+            ) for booking_date in available]
+            db.session.add_all(bookings)
+            db.session.flush()  # Get booking codes populated
+            bump_content_version(hall_version_key(hall.id))
+            payloads = [booking_payload(booking) for booking in bookings]
+            user_id = current_user.id if current_user.is_authenticated else 0
+            username = current_user.username if current_user.is_authenticated else user_name
+            if group_code is None:
+                booking = bookings[0]
+                log_action(hall.id, user_id, username, "Booking Created", f"Booking {booking.booking_code} created for {booking.booking_date}.")
+                db.session.commit()
+                publish_booking_event(hall.id, "created", payloads)
+                return redirect(url_for('main.booking_confirmation', booking_code=booking.booking_code))
+
+            log_action(hall.id, user_id, username, "Booking Group Created",
+                       f"Booking group {group_code} created for {', '.join(str(d) for d in available)}.")
+            db.session.commit()
+            publish_booking_event(hall.id, "created", payloads)
+            if taken:
+                flash(f"Already booked and skipped: {', '.join(str(d) for d in sorted(taken))}.")
+            return redirect(url_for('main.booking_group_confirmation', group_code=group_code))
 
     return render_template(
         'hall_detail.html',
@@ -503,6 +673,14 @@ def booking_confirmation(booking_code):
     hall = Hall.query.get(booking.hall_id)
     return render_template('booking_confirmation.html', booking=booking, hall=hall)
 
+@main.route('/booking/group/<group_code>')
+def booking_group_confirmation(group_code):
+    bookings = Booking.query.filter_by(group_code=group_code).order_by(Booking.booking_date).all()
+    if not bookings:
+        abort(404)
+    hall = Hall.query.get(bookings[0].hall_id)
+    return render_template('booking_group_confirmation.html', bookings=bookings, group_code=group_code, hall=hall)
+
 @main.route('/dashboard')
 @login_required
 def dashboard():
@@ -517,9 +695,46 @@ def dashboard():
     return render_template('dashboard.html', hall=hall,
                            approved_bookings=approved_bookings,
                            pending_bookings=pending_bookings,
-                           logs=logs)
+                           logs=logs,
+                           bulk_form=BulkBookingForm())
 
 
+@main.route('/dashboard/events')
+@login_required
+def dashboard_events():
+    if current_user.hall_id is None:
+        abort(403)
+    broker = current_app.extensions['event_broker']
+    channel = hall_channel(current_user.hall_id)
+    events = broker.subscribe(channel)
+    if events is None:
+        # Every stream slot in this worker is taken; keep the thread free for regular
+        # requests and let the browser retry later.
+        response = current_app.response_class("retry: 60000\n\n", mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    # The generator runs after the request context is gone, so it must only touch the queue.
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(channel, events)
+
+    response = current_app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @main.route('/booking/<int:booking_id>/edit', methods=['GET','POST'])
 @login_required
 @hall_manager_required
@@ -540,9 +755,11 @@ def edit_booking(booking_id):
         action = request.form.get("action")
         if action == "approve":
             booking.status = 'approved'
+        bump_content_version(hall_version_key(booking.hall_id))
         db.session.commit()
         log_action(current_user.hall_id, current_user.id, current_user.username, "Edit Booking", f"Booking {booking.booking_code} edited.")
         db.session.commit()
+        publish_booking_event(booking.hall_id, "approved" if action == "approve" else "updated", [booking_payload(booking)])
         flash("Booking updated.")
         return redirect(url_for('main.dashboard'))
     return render_template('edit_booking.html', form=form, booking=booking)
@@ -556,12 +773,71 @@ def cancel_booking(booking_id):
         flash("Unauthorized action.")
         return redirect(url_for('main.dashboard'))
     booking.status = 'cancelled'
+    bump_content_version(hall_version_key(booking.hall_id))
     db.session.commit()
     log_action(current_user.hall_id, current_user.id, current_user.username, "Cancel Booking", f"Booking {booking.booking_code} cancelled.")
     db.session.commit()
+    publish_booking_event(booking.hall_id, "cancelled", [booking_payload(booking)])
     flash("Booking cancelled.")
     return redirect(url_for('main.dashboard'))
 
+@main.route('/dashboard/bookings/bulk', methods=['POST'])
+@login_required
+@hall_manager_required
+def bulk_booking_action():
+    form = BulkBookingForm()
+    if not form.validate_on_submit():
+        flash("Invalid bulk action.")
+        return redirect(url_for('main.dashboard'))
+    booking_ids = set(request.form.getlist("booking_ids", type=int))
+    if not booking_ids:
+        flash("No bookings selected.")
+        return redirect(url_for('main.dashboard'))
+    bookings = Booking.query.filter(Booking.id.in_(list(booking_ids)), Booking.hall_id == current_user.hall_id).all()
+    if len(bookings) != len(booking_ids):
+        flash("Unauthorized action.")
+        return redirect(url_for('main.dashboard'))
+
+    if form.action.data == "approve":
+        targets = [b for b in bookings if b.status == 'pending']
+        # A slot conflicts if it is targeted twice or already held by any approved booking,
+        # selected or not.
+        conflicts = set()
+        seen = set()
+        for b in targets:
+            slot = (b.booking_date, b.time_slot)
+            if slot in seen:
+                conflicts.add(slot)
+            seen.add(slot)
+        taken = db.session.query(Booking.booking_date, Booking.time_slot).filter(
+            Booking.hall_id == current_user.hall_id,
+            Booking.booking_date.in_([date for date, _ in seen]),
+            Booking.status == 'approved',
+            Booking.id.notin_([b.id for b in targets])
+        ).all()
+        conflicts.update(slot for slot in taken if tuple(slot) in seen)
+        if conflicts:
+            codes = [b.booking_code for b in targets if (b.booking_date, b.time_slot) in conflicts]
+            flash(f"Nothing approved: slot already taken for bookings {', '.join(codes)}.")
+            return redirect(url_for('main.dashboard'))
+        new_status, action_name = 'approved', "Bulk Approve Bookings"
+    else:
+        targets = [b for b in bookings if b.status != 'cancelled']
+        new_status, action_name = 'cancelled', "Bulk Cancel Bookings"
+
+    if not targets:
+        flash("No bookings needed updating.")
+        return redirect(url_for('main.dashboard'))
+    payloads = [dict(booking_payload(b), status=new_status) for b in targets]
+    Booking.query.filter(Booking.id.in_([b.id for b in targets])).update({"status": new_status}, synchronize_session=False)
+    bump_content_version(hall_version_key(current_user.hall_id))
+    log_action(current_user.hall_id, current_user.id, current_user.username, action_name,
+               f"Bookings {', '.join(b.booking_code for b in targets)} {new_status}.")
+    db.session.commit()
+    publish_booking_event(current_user.hall_id, new_status, payloads)
+    flash(f"{len(targets)} bookings {new_status}.")
+    return redirect(url_for('main.dashboard'))
+
 @main.route('/change_password', methods=['GET','POST'])
 @login_required
 def change_password():
@@ -577,6 +853,43 @@ def change_password():
         return redirect(url_for('main.dashboard'))
     return render_template('change_password.html', form=form)
 
+# --- CLI Commands ---
+@main.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help="Only report what would be removed.")
+@click.option('--batch-size', default=500, show_default=True, help="Files removed per batch.")
+@click.option('--grace-minutes', default=60, show_default=True, help="Skip files modified more recently than this.")
+def gc_uploads(dry_run, batch_size, grace_minutes):
+    """Remove uploaded pictures that no hall references anymore."""
+    referenced = set()
+    for (pictures,) in db.session.query(Hall.pictures).yield_per(batch_size):
+        referenced.update(json.loads(pictures) if pictures else [])
+
+    # Files this young may belong to an upload whose hall is not committed yet.
+    cutoff = time.time() - grace_minutes * 60
+    orphans = []
+    with os.scandir(current_app.config['UPLOAD_FOLDER']) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in referenced and entry.stat().st_mtime < cutoff:
+                orphans.append(entry)
+
+    total_bytes = sum(entry.stat().st_size for entry in orphans)
+    click.echo(f"{len(referenced)} referenced pictures, {len(orphans)} orphaned files ({total_bytes} bytes).")
+    if dry_run:
+        for entry in orphans:
+            click.echo(f"would remove {entry.name}")
+        return
+
+    removed = 0
+    for start in range(0, len(orphans), batch_size):
+        for entry in orphans[start:start + batch_size]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        click.echo(f"Removed {removed}/{len(orphans)} files.")
+    logging.info(f"gc-uploads removed {removed} orphaned files ({total_bytes} bytes).")
+
 @main.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
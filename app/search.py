@@ -0,0 +1,140 @@
+import re
+import json
+from sqlalchemy import event, text, func, literal, union_all
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Hall, HallSearchTerm
+
+SEARCH_FIELDS = ('name', 'morning_description', 'evening_description',
+                 'morning_highlights', 'evening_highlights', 'instructions')
+# bm25 column weights and inverted index term weights, in SEARCH_FIELDS order
+FIELD_WEIGHTS = (10, 2, 2, 3, 3, 1)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# "fts5" on SQLite builds that ship it, otherwise "terms" (the HallSearchTerm table)
+SEARCH_BACKEND = None
+
+def include_name(name, type_, parent_names):
+    """Alembic autogenerate filter: hall_fts and its shadow tables are managed by init_search, not migrations."""
+    if type_ == "table":
+        return not name.startswith("hall_fts")
+    return True
+
+def field_text(hall, field):
+    value = getattr(hall, field) or ""
+    if field.endswith('_highlights'):
+        try:
+            return " ".join(json.loads(value))
+        except ValueError:
+            return value
+    return value
+
+def tokenize(value):
+    return [token[:50] for token in TOKEN_RE.findall(value.lower())]
+
+def index_hall(connection, hall):
+    if SEARCH_BACKEND == "fts5":
+        connection.execute(text("DELETE FROM hall_fts WHERE rowid = :id"), {"id": hall.id})
+        values = {field: field_text(hall, field) for field in SEARCH_FIELDS}
+        connection.execute(text(
+            f"INSERT INTO hall_fts (rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES (:id, {', '.join(':' + field for field in SEARCH_FIELDS)})"
+        ), {"id": hall.id, **values})
+    else:
+        connection.execute(HallSearchTerm.__table__.delete().where(HallSearchTerm.hall_id == hall.id))
+        weights = {}
+        for field, weight in zip(SEARCH_FIELDS, FIELD_WEIGHTS):
+            for term in tokenize(field_text(hall, field)):
+                weights[term] = max(weights.get(term, 0), weight)
+        if weights:
+            connection.execute(HallSearchTerm.__table__.insert(),
+                               [{"hall_id": hall.id, "term": term, "weight": weight} for term, weight in weights.items()])
+
+def unindex_hall(connection, hall):
+    if SEARCH_BACKEND == "fts5":
+        connection.execute(text("DELETE FROM hall_fts WHERE rowid = :id"), {"id": hall.id})
+    else:
+        connection.execute(HallSearchTerm.__table__.delete().where(HallSearchTerm.hall_id == hall.id))
+
+def after_hall_write(mapper, connection, target):
+    index_hall(connection, target)
+
+def after_hall_delete(mapper, connection, target):
+    unindex_hall(connection, target)
+
+def init_search():
+    """Pick the search backend, keep it in sync with Hall writes and backfill it if it is stale.
+
+    Must be called inside an app context after db.create_all().
+    """
+    global SEARCH_BACKEND
+    SEARCH_BACKEND = "terms"
+    if db.engine.dialect.name == "sqlite":
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS hall_fts USING fts5({', '.join(SEARCH_FIELDS)}, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                ))
+            SEARCH_BACKEND = "fts5"
+        except OperationalError:
+            pass  # SQLite built without FTS5
+
+    if not event.contains(Hall, 'after_insert', after_hall_write):
+        event.listen(Hall, 'after_insert', after_hall_write)
+        event.listen(Hall, 'after_update', after_hall_write)
+        event.listen(Hall, 'after_delete', after_hall_delete)
+
+    hall_count = db.session.query(func.count(Hall.id)).scalar()
+    if SEARCH_BACKEND == "fts5":
+        indexed_count = db.session.execute(text("SELECT count(*) FROM hall_fts")).scalar()
+    else:
+        indexed_count = db.session.query(func.count(func.distinct(HallSearchTerm.hall_id))).scalar()
+    if indexed_count != hall_count:
+        rebuild_search_index()
+
+def rebuild_search_index():
+    if SEARCH_BACKEND == "fts5":
+        db.session.execute(text("DELETE FROM hall_fts"))
+    else:
+        HallSearchTerm.query.delete()
+    connection = db.session.connection()
+    for hall in Hall.query.yield_per(500):
+        index_hall(connection, hall)
+    db.session.commit()
+
+def search_halls(query, page=1, per_page=20):
+    """Return (halls, total) for halls matching every word of query, best matches first.
+
+    The last word is matched as a prefix so partially typed queries already find results.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return [], 0
+    offset = (page - 1) * per_page
+
+    if SEARCH_BACKEND == "fts5":
+        match = " ".join(f'"{token}"' for token in tokens[:-1]) + f' "{tokens[-1]}"*'
+        total = db.session.execute(text("SELECT count(*) FROM hall_fts WHERE hall_fts MATCH :match"),
+                                   {"match": match}).scalar()
+        hall_ids = db.session.execute(text(
+            "SELECT rowid FROM hall_fts WHERE hall_fts MATCH :match "
+            f"ORDER BY bm25(hall_fts, {', '.join(str(w) for w in FIELD_WEIGHTS)}) LIMIT :limit OFFSET :offset"
+        ), {"match": match, "limit": per_page, "offset": offset}).scalars().all()
+    else:
+        matches = union_all(*[
+            db.select(HallSearchTerm.hall_id, HallSearchTerm.weight, literal(i).label("token"))
+            .where(HallSearchTerm.term.startswith(token, autoescape=True) if i == len(tokens) - 1
+                   else HallSearchTerm.term == token)
+            for i, token in enumerate(tokens)
+        ]).subquery()
+        ranked = (db.select(matches.c.hall_id)
+                  .group_by(matches.c.hall_id)
+                  .having(func.count(func.distinct(matches.c.token)) == len(tokens)))
+        total = db.session.execute(db.select(func.count()).select_from(ranked.subquery())).scalar()
+        hall_ids = db.session.execute(
+            ranked.order_by(func.sum(matches.c.weight).desc(), matches.c.hall_id).limit(per_page).offset(offset)
+        ).scalars().all()
+
+    halls = {hall.id: hall for hall in Hall.query.filter(Hall.id.in_(hall_ids))}
+    return [halls[hall_id] for hall_id in hall_ids if hall_id in halls], total
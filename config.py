@@ -10,5 +10,13 @@ class Config:
     REMEMBER_COOKIE_SECURE = True
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'app', 'static', 'uploads', 'halls')
-    CACHE_TYPE = 'simple'
+    # gunicorn.conf.py switches these through the environment when running several workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.getcwd(), 'cache'))
     CACHE_DEFAULT_TIMEOUT = 300
+    EVENT_BROKER = os.environ.get('EVENT_BROKER', 'local')  # 'database' relays dashboard events between worker processes
+    LOG_FILE = os.path.join('logs', 'app.log')
+    LOG_ROTATE = os.environ.get('LOG_ROTATE', '1') == '1'  # In-process rotation is unsafe with several writers
+    EVENT_STREAMS_PER_WORKER = int(os.environ.get('EVENT_STREAMS_PER_WORKER', 10))  # Each open dashboard stream holds a thread
+    EVENT_POLL_INTERVAL = 1.0  # Seconds between outbox polls for the database broker
+    ETAG_SALT = '1'  # Bump on deploy to invalidate pages cached by browsers
@@ -0,0 +1,62 @@
+# Production server settings. Run with: gunicorn -c gunicorn.conf.py wsgi:app
+# Every setting can be overridden from the environment; see DEPLOYMENT.md.
+import gc
+import os
+import signal
+import multiprocessing
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads keep long lived dashboard event streams from occupying a whole worker.
+threads = int(os.environ.get('THREADS', 4))
+# Open dashboard streams never finish, so only a quarter of the threads may hold one;
+# the rest stay free for the public pages and booking requests.
+os.environ.setdefault('EVENT_STREAMS_PER_WORKER', str(max(1, threads // 4)))
+worker_class = 'gthread'
+timeout = int(os.environ.get('TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 20))
+keepalive = 5
+max_requests = int(os.environ.get('MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Load the app once in the master so workers share its memory pages and the
+# one-off startup work (create_all, search index backfill) is not repeated per worker.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+if workers > 1:
+    # Module level state in the app is per process; switch it to shared backends.
+    os.environ.setdefault('CACHE_TYPE', 'FileSystemCache')
+    os.environ.setdefault('EVENT_BROKER', 'database')
+    os.environ.setdefault('LOG_ROTATE', '0')
+
+def when_ready(server):
+    # Move everything allocated during preload out of the collector's reach so
+    # the cyclic GC in the workers does not touch, and thus copy, those pages.
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Connections opened by the master during preload must not be shared with the children.
+    from wsgi import app
+    from app import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    # End open event streams as soon as shutdown starts instead of waiting out graceful_timeout.
+    from wsgi import app
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def close_streams(sig, frame):
+        app.extensions['event_broker'].close()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, close_streams)
+
+def worker_exit(server, worker):
+    from wsgi import app
+    from app import shutdown_app
+    shutdown_app(app)